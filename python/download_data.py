@@ -4,16 +4,173 @@
 Используем публичные данные для обучения модели
 """
 
-import requests
+import asyncio
+import io
+import zipfile
+import aiohttp
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import time
 import os
 
+# URL для публичного API Binance
+BINANCE_KLINES_URL = "https://api.binance.com/api/v3/klines"
+
+# Месячные архивы свечей Binance (те же данные, что и в API)
+BINANCE_ARCHIVE_URL = "https://data.binance.vision/data/spot/monthly/klines"
+
+# Binance API возвращает максимум 1000 свечей за запрос
+KLINES_LIMIT = 1000
+
+# Максимум одновременных запросов (вес klines = 1, лимит 1200 в минуту)
+MAX_CONCURRENT_REQUESTS = 10
+MAX_RETRIES = 5
+
+# Из 12 полей свечи Binance нужны только время открытия и OHLCV
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+INTERVAL_UNITS_MS = {
+    'm': 60 * 1000,
+    'h': 60 * 60 * 1000,
+    'd': 24 * 60 * 60 * 1000,
+    'w': 7 * 24 * 60 * 60 * 1000
+}
+
+def interval_to_ms(interval):
+    """Длительность интервала Binance ('1m', '4h', '1d', ...) в миллисекундах"""
+    return int(interval[:-1]) * INTERVAL_UNITS_MS[interval[-1]]
+
+async def fetch_klines(session, semaphore, params):
+    """Загружаем один блок свечей с повтором при превышении лимита запросов"""
+    async with semaphore:
+        for attempt in range(MAX_RETRIES):
+            try:
+                async with session.get(BINANCE_KLINES_URL, params=params) as response:
+                    if response.status in (418, 429):
+                        # Превышен лимит запросов - ждём и повторяем
+                        retry_after = float(response.headers.get('Retry-After', 2 ** attempt))
+                        print(f"⏳ Превышен лимит запросов, ждём {retry_after:.0f} с...")
+                        await asyncio.sleep(retry_after)
+                        continue
+                    
+                    response.raise_for_status()
+                    return await response.json()
+            
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"❌ Ошибка при загрузке: {e}")
+                await asyncio.sleep(2 ** attempt)
+    
+    print(f"❌ Не удалось загрузить блок с {datetime.fromtimestamp(params['startTime']/1000)}")
+    return None
+
+async def fetch_klines_range(session, semaphore, symbol, interval, start_ts, end_ts):
+    """Параллельно загружаем через API все блоки свечей за период"""
+    # Границы блоков известны заранее: каждый блок - KLINES_LIMIT свечей
+    chunk_ms = interval_to_ms(interval) * KLINES_LIMIT
+    
+    chunks = await asyncio.gather(*[
+        fetch_klines(session, semaphore, {
+            'symbol': symbol,
+            'interval': interval,
+            'startTime': ts,
+            'endTime': min(ts + chunk_ms - 1, end_ts),
+            'limit': KLINES_LIMIT
+        })
+        for ts in range(start_ts, end_ts + 1, chunk_ms)
+    ])
+    
+    failed = sum(1 for chunk in chunks if chunk is None)
+    if failed:
+        print(f"⚠️ Не загружено блоков: {failed}")
+    
+    return [row for chunk in chunks if chunk for row in chunk]
+
+async def fetch_monthly_archive(session, semaphore, symbol, interval, month):
+    """Загружаем месячный ZIP-архив свечей, None если архива нет"""
+    name = f"{symbol}-{interval}-{month.year}-{month.month:02d}"
+    url = f"{BINANCE_ARCHIVE_URL}/{symbol}/{interval}/{name}.zip"
+    
+    async with semaphore:
+        try:
+            async with session.get(url) as response:
+                if response.status != 200:
+                    return None
+                content = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"❌ Ошибка при загрузке архива {name}: {e}")
+            return None
+    
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        with archive.open(archive.namelist()[0]) as csv_file:
+            df = pd.read_csv(
+                csv_file, header=None, usecols=range(6), names=['timestamp'] + OHLCV_COLUMNS
+            )
+    
+    timestamps = df['timestamp'].to_numpy(np.int64)
+    
+    # С 2025 года архивы содержат время в микросекундах
+    if len(timestamps) and timestamps[0] > 10**14:
+        timestamps //= 1000
+    
+    print(f"✅ Архив {name}: {len(df)} свечей")
+    return timestamps, df[OHLCV_COLUMNS].to_numpy(np.float64)
+
+def klines_to_arrays(rows):
+    """Свечи из API (списки строк) -> время открытия (int64) и OHLCV (float64)"""
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty((0, 5), dtype=np.float64)
+    
+    arr = np.asarray(rows, dtype=object)[:, :6]
+    return arr[:, 0].astype(np.int64), arr[:, 1:].astype(np.float64)
+
+async def download_klines(symbol, interval, start_ts, end_ts):
+    """
+    Загружаем свечи за период: полные месяцы из архивов data.binance.vision,
+    месяцы без архива (например, текущий) - через API
+    """
+    months = pd.period_range(
+        pd.Timestamp(start_ts, unit='ms'), pd.Timestamp(end_ts, unit='ms'), freq='M'
+    )
+    print(f"⏳ Загружаем {len(months)} месячных архивов...")
+    
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    async with aiohttp.ClientSession() as session:
+        archives = await asyncio.gather(*[
+            fetch_monthly_archive(session, semaphore, symbol, interval, month)
+            for month in months
+        ])
+        
+        # Месяцы без архива догружаем через API
+        missing = [month for month, archive in zip(months, archives) if archive is None]
+        if missing:
+            print(f"⏳ Архивов нет для {len(missing)} мес., загружаем через API...")
+        
+        rest_rows = await asyncio.gather(*[
+            fetch_klines_range(
+                session, semaphore, symbol, interval,
+                max(start_ts, month.start_time.value // 10**6),
+                min(end_ts, month.end_time.value // 10**6)
+            )
+            for month in missing
+        ])
+    
+    parts = [archive for archive in archives if archive is not None]
+    parts.append(klines_to_arrays([row for rows in rest_rows for row in rows]))
+    
+    timestamps = np.concatenate([ts for ts, _ in parts])
+    values = np.concatenate([v for _, v in parts])
+    
+    # Фильтруем по датам до создания DataFrame
+    mask = (timestamps >= start_ts) & (timestamps <= end_ts)
+    timestamps, values = timestamps[mask], values[mask]
+    
+    # Сортируем по времени открытия и убираем дубликаты
+    timestamps, unique_idx = np.unique(timestamps, return_index=True)
+    return timestamps, values[unique_idx]
+
 def download_binance_data(symbol='BTCUSDT', interval='1h', start_date='2020-01-01', end_date='2024-12-31'):
     """
-    Скачиваем исторические данные с Binance публичного API
+    Скачиваем исторические данные с Binance (месячные архивы + публичный API)
     
     Args:
         symbol: Торговая пара (например, 'BTCUSDT')
@@ -25,85 +182,24 @@ def download_binance_data(symbol='BTCUSDT', interval='1h', start_date='2020-01-0
     print(f"📊 Скачиваем данные для {symbol} с {start_date} по {end_date}")
     print(f"⏱️ Интервал: {interval}")
     
-    # Преобразуем даты в timestamp
-    start_ts = int(datetime.strptime(start_date, '%Y-%m-%d').timestamp() * 1000)
-    end_ts = int(datetime.strptime(end_date, '%Y-%m-%d').timestamp() * 1000)
-    
-    # URL для публичного API Binance
-    base_url = "https://api.binance.com/api/v3/klines"
+    # Преобразуем даты в timestamp (мс, UTC - как и время свечей Binance)
+    start_ts = pd.Timestamp(start_date).value // 10**6
+    end_ts = pd.Timestamp(end_date).value // 10**6
     
-    all_data = []
-    current_ts = start_ts
+    timestamps, values = asyncio.run(download_klines(symbol, interval, start_ts, end_ts))
     
-    # Binance API возвращает максимум 1000 свечей за запрос
-    limit = 1000
-    
-    while current_ts < end_ts:
-        # Параметры запроса
-        params = {
-            'symbol': symbol,
-            'interval': interval,
-            'startTime': current_ts,
-            'limit': limit
-        }
-        
-        try:
-            print(f"⏳ Загружаем данные с {datetime.fromtimestamp(current_ts/1000)}...")
-            
-            response = requests.get(base_url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if not data:
-                print("📭 Больше данных нет")
-                break
-            
-            all_data.extend(data)
-            
-            # Обновляем timestamp для следующего запроса
-            current_ts = data[-1][0] + 1
-            
-            # Пауза между запросами (чтобы не перегружать API)
-            time.sleep(0.1)
-            
-            print(f"✅ Загружено {len(data)} свечей")
-            
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Ошибка при загрузке: {e}")
-            break
-        except Exception as e:
-            print(f"❌ Неожиданная ошибка: {e}")
-            break
-    
-    if not all_data:
+    if len(timestamps) == 0:
         print("❌ Не удалось загрузить данные")
         return None
     
-    print(f"🎉 Всего загружено {len(all_data)} свечей")
-    
-    # Преобразуем в DataFrame
-    df = pd.DataFrame(all_data, columns=[
-        'timestamp', 'open', 'high', 'low', 'close', 'volume',
-        'close_time', 'quote_asset_volume', 'number_of_trades',
-        'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
-    ])
-    
-    # Обрабатываем данные
-    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-    df = df.set_index('timestamp')
-    
-    # Конвертируем в числовые типы
-    numeric_columns = ['open', 'high', 'low', 'close', 'volume']
-    for col in numeric_columns:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    # Фильтруем по датам
-    df = df[(df.index >= pd.to_datetime(start_date)) & 
-            (df.index <= pd.to_datetime(end_date))]
+    print(f"🎉 Всего загружено {len(timestamps)} свечей")
     
-    # Убираем лишние колонки, оставляем только OHLCV
-    df = df[['open', 'high', 'low', 'close', 'volume']]
+    # Преобразуем в DataFrame (только OHLCV, уже отфильтровано по датам)
+    df = pd.DataFrame(
+        values,
+        columns=OHLCV_COLUMNS,
+        index=pd.DatetimeIndex(pd.to_datetime(timestamps, unit='ms'), name='timestamp')
+    )
     
     print(f"📈 Диапазон цен: {df['close'].min():.2f} - {df['close'].max():.2f}")
     print(f"📅 Период: {df.index.min()} - {df.index.max()}")
@@ -116,14 +212,14 @@ def save_data(df, symbol='BTCUSDT', interval='1h', start_date='2020-01-01', end_
     # Создаём папку data если её нет
     os.makedirs('data', exist_ok=True)
     
-    # Имя файла (только CSV)
-    csv_filename = f"data/{symbol}_{interval}_{start_date}_{end_date}.csv"
+    # Имя файла (Parquet: бинарный колоночный формат, без парсинга строк при загрузке)
+    parquet_filename = f"data/{symbol}_{interval}_{start_date}_{end_date}.parquet"
     
-    # Сохраняем в CSV
-    df.to_csv(csv_filename)
-    print(f"💾 Данные сохранены в {csv_filename}")
+    # Сохраняем в Parquet
+    df.to_parquet(parquet_filename, compression='snappy')
+    print(f"💾 Данные сохранены в {parquet_filename}")
     
-    return csv_filename
+    return parquet_filename
 
 def main():
     """Основная функция"""
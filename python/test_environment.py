@@ -3,60 +3,47 @@
 Простой скрипт для тестирования RL среды трейдинга
 """
 
-import sys
-import os
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
-# Добавляем путь к модулям
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
-
-from environment.trading_env import TradingEnvironment
+from trading_agent.environment.trading_env import TradingEnvironment
 
 def create_sample_data():
     """Создание тестовых данных"""
     print("Создаём тестовые данные...")
     
     # Создаём синтетические данные OHLCV
-    dates = pd.date_range(start='2024-01-01', end='2024-01-31', freq='1H')
+    dates = pd.date_range(start='2024-01-01', end='2024-01-31', freq='1H', name='timestamp')
     n_days = len(dates)
     
     # Базовые параметры
     base_price = 50000  # BTC цена
     volatility = 0.02   # 2% волатильность
     
-    # Генерируем цены
-    np.random.seed(42)  # Для воспроизводимости
+    # Генерируем цены (все случайные ряды - одним вызовом на ряд)
+    rng = np.random.default_rng(42)  # Для воспроизводимости
     
-    returns = np.random.normal(0, volatility, n_days)
+    returns = rng.normal(0, volatility, n_days)
     prices = base_price * np.exp(np.cumsum(returns))
     
+    # Добавляем случайность к OHLC
+    h_noise = np.abs(rng.normal(0, 0.01, n_days))
+    l_noise = np.abs(rng.normal(0, 0.01, n_days))
+    o_noise = rng.normal(0, 0.005, n_days)
+    c_noise = rng.normal(0, 0.005, n_days)
+    
+    # Объём
+    volume = rng.uniform(100, 1000, n_days)
+    
     # Создаём OHLCV
-    data = []
-    for i in range(len(dates)):
-        date = dates[i]
-        price = prices[i]
-        # Добавляем случайность к OHLC
-        high = price * (1 + abs(np.random.normal(0, 0.01)))
-        low = price * (1 - abs(np.random.normal(0, 0.01)))
-        open_price = price * (1 + np.random.normal(0, 0.005))
-        close_price = price * (1 + np.random.normal(0, 0.005))
-        
-        # Объём
-        volume = np.random.uniform(100, 1000)
-        
-        data.append({
-            'timestamp': date,
-            'open': open_price,
-            'high': high,
-            'low': low,
-            'close': close_price,
-            'volume': volume
-        })
-    
-    df = pd.DataFrame(data)
-    df = df.set_index('timestamp')
+    df = pd.DataFrame({
+        'open': prices * (1 + o_noise),
+        'high': prices * (1 + h_noise),
+        'low': prices * (1 - l_noise),
+        'close': prices * (1 + c_noise),
+        'volume': volume
+    }, index=dates)
     
     print(f"Создано {len(df)} тестовых свечей")
     print(f"Диапазон цен: {df['close'].min():.2f} - {df['close'].max():.2f}")
@@ -86,6 +73,7 @@ def test_environment():
     
     # Тестируем несколько эпизодов
     n_episodes = 3
+    env_step = env.step  # локальная ссылка вместо поиска атрибута на каждом шаге
     
     for episode in range(n_episodes):
         print(f"\n--- Эпизод {episode + 1} ---")
@@ -96,21 +84,29 @@ def test_environment():
         
         total_reward = 0
         step = 0
+        n_steps = 100  # Ограничиваем количество шагов для теста
+        
+        # Случайные действия генерируются заранее на весь эпизод
+        actions = np.random.default_rng().integers(0, env.action_space.n, size=n_steps)
         
-        while step < 100:  # Ограничиваем количество шагов для теста
-            # Случайное действие
-            action = env.action_space.sample()
+        # Вывод по шагам копится и печатается одним вызовом после цикла
+        log_lines = []
+        while step < n_steps:
+            action = int(actions[step])
             
-            obs, reward, done, truncated, info = env.step(action)
+            obs, reward, done, truncated, info = env_step(action)
             total_reward += reward
             step += 1
             
             if step % 20 == 0:
-                print(f"Шаг {step}: Действие={action}, Награда={reward:.6f}, Баланс={info['balance']:.2f}")
+                log_lines.append(f"Шаг {step}: Действие={action}, Награда={reward:.6f}, Баланс={info['balance']:.2f}")
             
             if done:
                 break
         
+        if log_lines:
+            print("\n".join(log_lines))
+        
         # Получаем статистику
         stats = env.get_statistics()
         print(f"Эпизод завершён за {step} шагов")
@@ -144,33 +140,40 @@ def test_simple_strategy():
     obs, info = env.reset()
     step = 0
     
-    while step < 200:  # 200 шагов
-        # Получаем текущую цену
-        current_price = env.data.iloc[env.current_step - 1]['close'] if env.current_step > 0 else env.data.iloc[0]['close']
-        
-        # Простая логика: если цена упала на 1%, покупаем
-        if step > 0:
-            prev_price = env.data.iloc[step - 1]['close']
-            price_change = (current_price - prev_price) / prev_price
-            
-            if price_change < -0.01:  # Падение на 1%
-                action = 1  # BUY
-            elif price_change > 0.01:  # Рост на 1%
-                action = 2  # SELL
-            else:
-                action = 0  # HOLD
-        else:
-            action = 0  # HOLD
+    # Цены закрытия одним массивом вместо поиска по DataFrame на каждом шаге
+    close_arr = env.data['close'].to_numpy()
+    
+    # Сигналы стратегии зависят только от истории цен - считаем их до цикла
+    n_steps = 200  # 200 шагов
+    steps = np.arange(n_steps)
+    current_prices = close_arr[np.minimum(env.current_step - 1 + steps, len(close_arr) - 1)]
+    prev_prices = close_arr[np.maximum(steps - 1, 0)]
+    price_change = (current_prices - prev_prices) / prev_prices
+    
+    # Простая логика: падение на 1% - BUY, рост на 1% - SELL, иначе HOLD
+    actions = np.where(price_change < -0.01, 1, np.where(price_change > 0.01, 2, 0))
+    actions[0] = 0  # HOLD на первом шаге
+    
+    env_step = env.step  # локальная ссылка вместо поиска атрибута на каждом шаге
+    
+    # Вывод по шагам копится и печатается одним вызовом после цикла
+    log_lines = []
+    while step < n_steps:
+        current_price = current_prices[step]
+        action = int(actions[step])
         
-        obs, reward, done, truncated, info = env.step(action)
+        obs, reward, done, truncated, info = env_step(action)
         step += 1
         
         if step % 50 == 0:
-            print(f"Шаг {step}: Цена={current_price:.2f}, Действие={action}, Баланс={info['balance']:.2f}")
+            log_lines.append(f"Шаг {step}: Цена={current_price:.2f}, Действие={action}, Баланс={info['balance']:.2f}")
         
         if done:
             break
     
+    if log_lines:
+        print("\n".join(log_lines))
+    
     # Финальная статистика
     stats = env.get_statistics()
     print(f"\nФинальная статистика:")
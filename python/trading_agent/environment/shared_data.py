@@ -0,0 +1,69 @@
+"""
+Общие для процессов массивы рыночных данных в разделяемой памяти
+"""
+
+from multiprocessing import shared_memory
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+class SharedMarketArrays:
+    """
+    Набор неизменяемых numpy-массивов в разделяемой памяти
+
+    Главный процесс создаёт массивы через create() и передаёт воркерам
+    лёгкое описание spec; воркеры подключаются через attach() без копирования данных
+    """
+
+    def __init__(self, segments: Dict[str, shared_memory.SharedMemory],
+                 arrays: Dict[str, np.ndarray], owner: bool):
+        self._segments = segments
+        self.arrays = arrays
+        self._owner = owner
+
+    @classmethod
+    def create(cls, arrays: Dict[str, np.ndarray]) -> 'SharedMarketArrays':
+        """Копирование массивов в новые сегменты разделяемой памяти"""
+        segments = {}
+        shared = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            view = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+            view[...] = array
+            view.flags.writeable = False
+            segments[name] = shm
+            shared[name] = view
+        return cls(segments, shared, owner=True)
+
+    @classmethod
+    def attach(cls, spec: Dict[str, Tuple[str, tuple, str]]) -> 'SharedMarketArrays':
+        """Подключение к существующим сегментам по описанию spec"""
+        segments = {}
+        shared = {}
+        for name, (shm_name, shape, dtype) in spec.items():
+            shm = shared_memory.SharedMemory(name=shm_name)
+            view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+            view.flags.writeable = False
+            segments[name] = shm
+            shared[name] = view
+        return cls(segments, shared, owner=False)
+
+    @property
+    def spec(self) -> Dict[str, Tuple[str, tuple, str]]:
+        """Описание сегментов для передачи в другие процессы (pickle-совместимо)"""
+        return {
+            name: (self._segments[name].name, array.shape, array.dtype.str)
+            for name, array in self.arrays.items()
+        }
+
+    def close(self):
+        """Отключение от сегментов; владелец также удаляет их имена из системы"""
+        # Представления массивов держат буфер, их нужно освободить до close()
+        self.arrays = {}
+        for shm in self._segments.values():
+            shm.close()
+            if self._owner:
+                shm.unlink()
+        self._segments = {}
@@ -0,0 +1,421 @@
+import gymnasium as gym
+import numpy as np
+import pandas as pd
+from gymnasium import spaces
+from typing import Dict, List, Tuple, Optional, Any
+import logging
+from trading_agent.utils.config import Config
+from trading_agent.utils.jit import njit
+from trading_agent.environment.shared_data import SharedMarketArrays
+
+
+@njit(cache=True)
+def _build_observation(ohlcv, feat, start, stop, position, balance_ratio, out):
+    """Сборка вектора наблюдения в буфер out"""
+    # Первая свеча окна - абсолютные значения, остальные - относительные изменения
+    out[:5] = ohlcv[start]
+    out[5:-2] = feat.reshape(-1)[(start + 1) * 5:stop * 5]
+    
+    # Добавляем текущую позицию и баланс
+    out[-2] = position
+    out[-1] = balance_ratio
+
+
+class TradingEnvironment(gym.Env):
+    """
+    Reinforcement Learning среда для трейдинга криптовалютой
+    
+    Состояние: OHLCV данные за последние N свечей + текущая позиция
+    Действие: [-1, 0, 1] где -1 = SELL, 0 = HOLD, 1 = BUY
+    Награда: изменение PnL с учётом комиссий и проскальзывания
+    """
+    
+    ACTION_NAMES = ('HOLD', 'BUY', 'SELL')
+    
+    def __init__(
+        self,
+        data: Optional[pd.DataFrame] = None,
+        window_size: int = 64,
+        commission_rate: float = 0.0004,
+        slippage_rate: float = 0.0001,
+        initial_balance: float = 10000.0,
+        max_position_size: float = 0.1,
+        record_history: bool = False,
+        shared_data: Optional[SharedMarketArrays] = None
+    ):
+        """
+        data - свечи OHLCV (DataFrame с колонками open, high, low, close, volume)
+        
+        shared_data - внутренний путь для воркеров SubprocVecEnv (см. vec_env.create_vec_env):
+        среда читает готовые массивы из разделяемой памяти, а self.data остаётся None,
+        поэтому вне воркеров среду нужно создавать из data
+        """
+        super().__init__()
+        
+        if data is None and shared_data is None:
+            raise ValueError("Нужно передать data или shared_data")
+        
+        self.data = data
+        self.window_size = window_size
+        self.commission_rate = commission_rate
+        self.slippage_rate = slippage_rate
+        self.initial_balance = initial_balance
+        self.max_position_size = max_position_size
+        self.record_history = record_history  # история сделок и PnL (для анализа, не для обучения)
+        
+        # Целевая позиция для каждого действия: HOLD, BUY, SELL
+        self._action_positions = (0.0, max_position_size, -max_position_size)
+        
+        # Предрасчёт признаков; shared_data - уже посчитанные массивы в разделяемой
+        # памяти (воркеры SubprocVecEnv не держат собственных копий данных)
+        self._shared_data = shared_data
+        arrays = shared_data.arrays if shared_data is not None else self.precompute_arrays(data)
+        self._ohlcv = arrays['ohlcv']
+        self._feat = arrays['feat']
+        self._close = arrays['close']
+        self._ret = arrays['ret']
+        
+        # Индексы для навигации по данным
+        self.current_step = window_size
+        self.max_steps = len(self._close) - window_size - 1
+        
+        # Торговые параметры
+        self.balance = initial_balance
+        self.position = 0.0  # -1 до 1, где 0 = нет позиции
+        self.entry_price = 0.0
+        self.total_pnl = 0.0
+        self.trades_count = 0
+        
+        # Логирование
+        self.logger = self._setup_logger()
+        
+        # Определяем пространства состояний и действий
+        self.observation_space = self._get_observation_space()
+        self.action_space = self._get_action_space()
+        
+        # Буфер наблюдения, переиспользуемый на каждом шаге
+        self._obs_buf = np.zeros(self.observation_space.shape, dtype=np.float32)
+        
+        # История для анализа (PnL - предвыделенный массив на эпизод)
+        self.trade_history = []
+        self._pnl_arr = np.empty(max(self.max_steps + 1, 0) if record_history else 0, dtype=np.float32)
+        self._pnl_idx = 0
+        self._reset_stats()
+        
+    def _setup_logger(self) -> logging.Logger:
+        """Настройка логирования"""
+        logger = logging.getLogger(__name__)
+        logger.setLevel(logging.INFO)
+        
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            )
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        
+        return logger
+    
+    def _get_observation_space(self) -> spaces.Box:
+        """Определение пространства состояний"""
+        # OHLCV данные + текущая позиция + баланс
+        obs_size = self.window_size * 5 + 2  # 5 фичей OHLCV + позиция + баланс
+        return spaces.Box(
+            low=-np.inf, 
+            high=np.inf, 
+            shape=(obs_size,), 
+            dtype=np.float32
+        )
+    
+    def _get_action_space(self) -> spaces.Discrete:
+        """Определение пространства действий"""
+        # 0 = HOLD, 1 = BUY, 2 = SELL
+        return spaces.Discrete(3)
+    
+    @classmethod
+    def precompute_arrays(cls, data: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Неизменяемые массивы среды: OHLCV, признаки, цены закрытия и доходности"""
+        ohlcv, feat = cls._precompute_features(data)
+        
+        # float32, как и наблюдения; цены читаются через float(), чтобы баланс и PnL
+        # накапливались в двойной точности
+        close_f32 = ohlcv[:, 3].copy()
+        
+        # Доходность от текущей свечи к следующей (последняя - ноль)
+        close = data['close'].to_numpy(np.float64)
+        ret = np.zeros(len(close), dtype=np.float32)
+        ret[:-1] = np.diff(close) / close[:-1]
+        
+        return {'ohlcv': ohlcv, 'feat': feat, 'close': close_f32, 'ret': ret}
+    
+    @staticmethod
+    def _precompute_features(data: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Предрасчёт OHLCV и нормализованных признаков для всех свечей"""
+        ohlcv = data[['open', 'high', 'low', 'close', 'volume']].to_numpy(np.float64)
+        _, high, low, close, volume = ohlcv.T
+        
+        feat = np.empty((len(data), 5), dtype=np.float32)
+        if len(data) > 0:
+            # Первая свеча - абсолютные значения
+            feat[0] = ohlcv[0]
+            
+            # Остальные свечи - относительные изменения к предыдущему close
+            prev_close = close[:-1]
+            feat[1:, 0] = np.log(close[1:] / prev_close)  # log return для open
+            feat[1:, 1] = np.log(high[1:] / prev_close)
+            feat[1:, 2] = np.log(low[1:] / prev_close)
+            feat[1:, 3] = np.log(close[1:] / prev_close)
+            feat[1:, 4] = (volume[1:] - volume[:-1]) / volume[:-1]  # относительное изменение объёма
+        
+        return ohlcv.astype(np.float32), feat
+    
+    def _get_observation(self) -> np.ndarray:
+        """
+        Получение текущего состояния
+        
+        Возвращает внутренний буфер, который перезаписывается следующим step()
+        или reset(): вызывающий код, которому нужно сохранить наблюдение, должен
+        его скопировать (step() сам отдаёт копию на последнем шаге эпизода)
+        """
+        _build_observation(
+            self._ohlcv,
+            self._feat,
+            self.current_step - self.window_size,
+            self.current_step,
+            self.position,
+            self.balance / self.initial_balance,
+            self._obs_buf
+        )
+        
+        return self._obs_buf
+    
+    def _calculate_reward(self, action: int) -> float:
+        """Расчёт награды за действие"""
+        if self.current_step >= len(self._ret) - 1:
+            return 0.0
+        
+        # PnL позиции за шаг: доходность со знаком позиции (long/short) и её размером
+        reward = float(self._ret[self.current_step]) * self.position
+        
+        # Штраф за комиссии и проскальзывание (ноль при отсутствии позиции)
+        reward -= abs(self.position) * (self.commission_rate + self.slippage_rate)
+        
+        # Штраф за частые сделки (если действие != HOLD)
+        if action != 0:
+            reward -= 0.0001  # Небольшой штраф за активность
+        
+        return reward
+    
+    def _execute_action(self, action: int) -> None:
+        """Исполнение действия"""
+        if action == 0:  # HOLD
+            return
+        
+        # BUY - целевая позиция long, SELL - short; если уже в ней, ничего не делаем
+        target_position = self._action_positions[action]
+        if self.position == target_position:
+            return
+        
+        current_price = float(self._close[self.current_step])
+        
+        # Закрываем противоположную позицию если есть
+        if self.position * target_position < 0:
+            self._close_position(current_price)
+        
+        # Открываем позицию в направлении действия
+        new_position = abs(target_position - self.position)
+        self.position = target_position
+        self.entry_price = current_price
+        self.trades_count += 1
+        
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                "%s: %.4f по цене %.2f", self.ACTION_NAMES[action], new_position, current_price
+            )
+    
+    def _close_position(self, price: float) -> None:
+        """Закрытие позиции"""
+        if self.position != 0:
+            # Рассчитываем PnL
+            if self.position > 0:  # Long
+                pnl = (price - self.entry_price) / self.entry_price * abs(self.position)
+            else:  # Short
+                pnl = (self.entry_price - price) / self.entry_price * abs(self.position)
+            
+            self.total_pnl += pnl
+            self.balance += pnl
+            
+            # Счётчики сделок для статистики
+            self._closed_trades += 1
+            if pnl > 0:
+                self._winning_trades += 1
+            
+            # Записываем сделку в историю
+            if self.record_history:
+                self.trade_history.append({
+                    'entry_price': self.entry_price,
+                    'exit_price': price,
+                    'position': self.position,
+                    'pnl': pnl,
+                    'step': self.current_step
+                })
+            
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("Закрыта позиция: PnL = %.4f, Баланс = %.2f", pnl, self.balance)
+            
+            # Сбрасываем позицию
+            self.position = 0.0
+            self.entry_price = 0.0
+    
+    @property
+    def pnl_history(self) -> np.ndarray:
+        """История PnL по шагам текущего эпизода (только при record_history)"""
+        return self._pnl_arr[:self._pnl_idx]
+    
+    def _reset_stats(self) -> None:
+        """Сброс накопительной статистики PnL и сделок"""
+        self._closed_trades = 0  # количество закрытых сделок
+        self._winning_trades = 0  # количество прибыльных сделок
+        self._pnl_count = 0      # количество записанных значений PnL
+        self._pnl_last = 0.0     # последнее записанное значение PnL
+        self._pnl_min = 0.0      # минимальное значение PnL
+        self._ret_mean = 0.0     # среднее изменений PnL (алгоритм Уэлфорда)
+        self._ret_m2 = 0.0       # сумма квадратов отклонений изменений PnL
+    
+    def _update_pnl_stats(self, pnl: float) -> None:
+        """Обновление накопительной статистики PnL за O(1)"""
+        if self._pnl_count == 0:
+            self._pnl_min = pnl
+        else:
+            ret = pnl - self._pnl_last
+            n_returns = self._pnl_count
+            delta = ret - self._ret_mean
+            self._ret_mean += delta / n_returns
+            self._ret_m2 += delta * (ret - self._ret_mean)
+            self._pnl_min = min(self._pnl_min, pnl)
+        
+        self._pnl_count += 1
+        self._pnl_last = pnl
+    
+    def step(self, action: int) -> Tuple[np.ndarray, float, bool, bool, Dict[str, Any]]:
+        """Выполнение шага в среде"""
+        # Проверяем валидность действия (без action_space.contains на каждом шаге)
+        action = int(action)
+        if not 0 <= action <= 2:
+            action = 0  # HOLD если действие невалидно
+        
+        # Исполняем действие
+        self._execute_action(action)
+        
+        # Рассчитываем награду
+        reward = self._calculate_reward(action)
+        
+        # Переходим к следующему шагу
+        self.current_step += 1
+        
+        # Проверяем завершение эпизода
+        done = self.current_step >= self.max_steps
+        
+        # Получаем новое состояние; последнее наблюдение эпизода копируем:
+        # векторные среды SB3 сохраняют его как terminal_observation и сразу
+        # вызывают reset(), который перезаписывает буфер
+        observation = self._get_observation()
+        if done:
+            observation = observation.copy()
+        
+        # Дополнительная информация
+        info = {
+            'balance': self.balance,
+            'position': self.position,
+            'total_pnl': self.total_pnl,
+            'trades_count': self.trades_count,
+            'current_price': float(self._close[self.current_step - 1]) if self.current_step > 0 else 0.0
+        }
+        
+        # Записываем PnL в историю
+        if self.record_history:
+            self._pnl_arr[self._pnl_idx] = self.total_pnl
+            self._pnl_idx += 1
+        self._update_pnl_stats(self.total_pnl)
+        
+        return observation, reward, done, False, info
+    
+    def reset(self, seed: Optional[int] = None) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """Сброс среды к начальному состоянию"""
+        super().reset(seed=seed)
+        
+        # Сбрасываем торговые параметры
+        self.current_step = self.window_size
+        self.balance = self.initial_balance
+        self.position = 0.0
+        self.entry_price = 0.0
+        self.total_pnl = 0.0
+        self.trades_count = 0
+        
+        # Очищаем историю
+        self.trade_history = []
+        self._pnl_idx = 0
+        self._reset_stats()
+        
+        # Получаем начальное состояние
+        observation = self._get_observation()
+        
+        info = {
+            'balance': self.balance,
+            'position': self.position,
+            'total_pnl': self.total_pnl,
+            'trades_count': self.trades_count
+        }
+        
+        return observation, info
+    
+    def render(self):
+        """Визуализация состояния (для отладки)"""
+        current_price = float(self._close[self.current_step - 1]) if self.current_step > 0 else 0.0
+        
+        print(f"Шаг: {self.current_step}")
+        print(f"Цена: {current_price:.2f}")
+        print(f"Позиция: {self.position:.4f}")
+        print(f"Баланс: {self.balance:.2f}")
+        print(f"Общий PnL: {self.total_pnl:.4f}")
+        print(f"Количество сделок: {self.trades_count}")
+        print("-" * 50)
+    
+    def close(self):
+        """Освобождение ресурсов среды (в том числе разделяемой памяти)"""
+        if self._shared_data is not None:
+            # Ссылки на буфер нужно отпустить до отключения от сегментов
+            self._ohlcv = self._feat = self._close = self._ret = None
+            self._shared_data.close()
+            self._shared_data = None
+        super().close()
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """Получение статистики торговли"""
+        # Нужно минимум два значения PnL, чтобы было хотя бы одно изменение
+        if self._pnl_count < 2:
+            return {}
+        
+        returns_std = np.sqrt(self._ret_m2 / (self._pnl_count - 1))
+        
+        # Базовые метрики
+        total_return = (self.balance - self.initial_balance) / self.initial_balance
+        sharpe_ratio = self._ret_mean / (returns_std + 1e-8) * np.sqrt(252)  # Годовой Sharpe
+        max_drawdown = self._pnl_min - self.initial_balance
+        
+        # Win rate
+        winning_trades = self._winning_trades
+        total_trades = self._closed_trades
+        win_rate = winning_trades / total_trades if total_trades > 0 else 0
+        
+        return {
+            'total_return': total_return,
+            'sharpe_ratio': sharpe_ratio,
+            'max_drawdown': max_drawdown,
+            'win_rate': win_rate,
+            'total_trades': total_trades,
+            'winning_trades': winning_trades,
+            'final_balance': self.balance,
+            'initial_balance': self.initial_balance
+        }
@@ -0,0 +1,66 @@
+"""
+Векторные среды Stable-Baselines3 для торговой среды
+"""
+
+from typing import Optional
+
+import pandas as pd
+from stable_baselines3.common.monitor import Monitor
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecEnv
+
+from trading_agent.environment.trading_env import TradingEnvironment
+from trading_agent.environment.shared_data import SharedMarketArrays
+from trading_agent.utils.config import Config
+
+
+def create_vec_env(
+    env: TradingEnvironment,
+    n_envs: Optional[int] = None,
+    data: Optional[pd.DataFrame] = None,
+    monitor: bool = False
+) -> VecEnv:
+    """
+    Создание векторной среды (n_envs параллельных процессов)
+
+    Параметры среды берутся из env, данные - из data (по умолчанию env.data).
+    Monitor (статистика эпизодов для логов SB3) добавляется только при monitor=True
+    """
+    if n_envs is None:
+        n_envs = Config.N_ENVS
+    if data is None:
+        data = env.data
+    if data is None:
+        raise ValueError("У среды нет data (создана из shared_data) - передайте data явно")
+
+    # Каждый процесс создаёт свою среду с теми же параметрами
+    env_kwargs = {
+        'window_size': env.window_size,
+        'commission_rate': env.commission_rate,
+        'slippage_rate': env.slippage_rate,
+        'initial_balance': env.initial_balance,
+        'max_position_size': env.max_position_size
+    }
+
+    def wrap(trading_env: TradingEnvironment):
+        return Monitor(trading_env) if monitor else trading_env
+
+    if n_envs == 1:
+        return DummyVecEnv([lambda: wrap(TradingEnvironment(data=data, **env_kwargs))])
+
+    # Массивы данных считаются один раз и кладутся в разделяемую память:
+    # воркеры получают только имена сегментов вместо копии DataFrame
+    shared = SharedMarketArrays.create(TradingEnvironment.precompute_arrays(data))
+    spec = shared.spec
+
+    def make_env():
+        return wrap(TradingEnvironment(shared_data=SharedMarketArrays.attach(spec), **env_kwargs))
+
+    try:
+        vec_env = SubprocVecEnv([make_env for _ in range(n_envs)])
+        # Дожидаемся подключения всех воркеров, после чего имена сегментов
+        # можно удалить - память освободится при закрытии последней среды
+        vec_env.get_attr('max_steps')
+    finally:
+        shared.close()
+
+    return vec_env
@@ -1,6 +1,7 @@
 import os
-import sys
+import importlib.util
 import logging
+from statistics import fmean, pstdev
 import numpy as np
 import pandas as pd
 from datetime import datetime
@@ -8,28 +9,36 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from stable_baselines3 import SAC
 from stable_baselines3.common.callbacks import EvalCallback, CheckpointCallback
-from stable_baselines3.common.vec_env import DummyVecEnv
-from stable_baselines3.common.monitor import Monitor
+from stable_baselines3.common.vec_env import VecEnv
 import torch
 import onnx
 import onnxruntime
+from onnxruntime.quantization import quantize_dynamic, QuantType
+from onnxruntime.quantization.shape_inference import quant_pre_process
 
-# Добавляем путь к модулям
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trading_agent.environment.trading_env import TradingEnvironment
+from trading_agent.environment.vec_env import create_vec_env
+from trading_agent.data.collector import BinanceDataCollector
+from trading_agent.utils.config import Config, get_config
+from trading_agent.utils.torch_utils import torch_compile_available, torch_version
 
-import sys
-import os
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
-from src.environment.trading_env import TradingEnvironment
-from src.data.collector import BinanceDataCollector
-from src.utils.config import Config
+class DeterministicActor(torch.nn.Module):
+    """Актор SAC для экспорта: детерминированное действие tanh(mean) без семплирования"""
+    
+    def __init__(self, actor: torch.nn.Module):
+        super().__init__()
+        self.actor = actor
+    
+    def forward(self, observation: torch.Tensor) -> torch.Tensor:
+        mean_actions, _, _ = self.actor.get_action_dist_params(observation)
+        return torch.tanh(mean_actions)
 
 class TradingModelTrainer:
     """Тренер для обучения SAC модели трейдинга"""
     
     def __init__(self):
         self.logger = self._setup_logger()
-        self.config = Config()
+        self.config = get_config()
         self.model = None
         self.env = None
         self.eval_env = None
@@ -105,15 +114,23 @@ class TradingModelTrainer:
         
         return env
     
-    def create_vec_env(self, env: TradingEnvironment) -> DummyVecEnv:
-        """Создание векторной среды для Stable-Baselines3"""
-        def make_env():
-            return Monitor(env)
-        
-        return DummyVecEnv([make_env])
+    def create_vec_env(
+        self,
+        env: TradingEnvironment,
+        n_envs: int = None,
+        data: pd.DataFrame = None,
+        monitor: bool = False
+    ) -> VecEnv:
+        """Создание векторной среды для Stable-Baselines3 (см. trading_agent.environment.vec_env)"""
+        return create_vec_env(env, n_envs=n_envs, data=data, monitor=monitor)
     
-    def setup_callbacks(self, eval_env: DummyVecEnv) -> list:
-        """Настройка колбэков для обучения"""
+    def setup_callbacks(self, eval_env: VecEnv, n_envs: int = 1) -> list:
+        """
+        Настройка колбэков для обучения
+        
+        Колбэки вызываются раз на шаг векторной среды, т.е. каждые n_envs шагов
+        среды, поэтому частоты делятся на n_envs
+        """
         callbacks = []
         
         # Колбэк для оценки
@@ -121,7 +138,8 @@ class TradingModelTrainer:
             eval_env,
             best_model_save_path=f"{self.config.MODEL_SAVE_PATH}/best_model/",
             log_path=f"{self.config.LOG_PATH}/eval/",
-            eval_freq=10000,
+            eval_freq=max(10000 // n_envs, 1),
+            n_eval_episodes=1,  # reset() детерминирован, эпизоды оценки совпадали бы
             deterministic=True,
             render=False
         )
@@ -129,7 +147,7 @@ class TradingModelTrainer:
         
         # Колбэк для сохранения чекпоинтов
         checkpoint_callback = CheckpointCallback(
-            save_freq=50000,
+            save_freq=max(50000 // n_envs, 1),
             save_path=f"{self.config.MODEL_SAVE_PATH}/checkpoints/",
             name_prefix="trading_model"
         )
@@ -137,6 +155,15 @@ class TradingModelTrainer:
         
         return callbacks
     
+    @staticmethod
+    def _get_device() -> str:
+        """Выбор устройства для обучения: CUDA, затем MPS, иначе CPU"""
+        if torch.cuda.is_available():
+            return "cuda"
+        if torch.backends.mps.is_available():
+            return "mps"
+        return "cpu"
+    
     def train_model(self, env: TradingEnvironment, total_timesteps: int = None) -> SAC:
         """Обучение SAC модели"""
         if total_timesteps is None:
@@ -144,37 +171,69 @@ class TradingModelTrainer:
         
         self.logger.info(f"Начинаем обучение SAC модели на {total_timesteps} шагах")
         
-        # Создаём векторную среду
-        vec_env = self.create_vec_env(env)
-        
-        # Создаём модель
-        model = SAC(
-            "MlpPolicy",
-            vec_env,
-            verbose=1,
-            learning_rate=self.config.LEARNING_RATE,
-            batch_size=self.config.BATCH_SIZE,
-            buffer_size=1000000,
-            learning_starts=1000,
-            tau=0.005,
-            gamma=0.99,
-            train_freq=1,
-            gradient_steps=1,
-            ent_coef="auto",
-            target_entropy="auto",
-            tensorboard_log=f"{self.config.LOG_PATH}/tensorboard/"
-        )
-        
-        # Настраиваем колбэки
-        callbacks = self.setup_callbacks(vec_env)
-        
-        # Обучаем модель
-        self.logger.info("Начинаем обучение...")
-        model.learn(
-            total_timesteps=total_timesteps,
-            callback=callbacks,
-            progress_bar=True
-        )
+        # Делим данные: обучение на начале, оценка на отложенном конце
+        split = int(len(env.data) * (1 - self.config.VALIDATION_SPLIT))
+        train_df = env.data.iloc[:split]
+        eval_df = env.data.iloc[split:]
+        self.logger.info(f"Данные для обучения: {len(train_df)}, для оценки: {len(eval_df)}")
+        
+        # Создаём векторные среды: обучающую с параллельными процессами и одну оценочную
+        # (Monitor нужен только оценочной среде - EvalCallback читает из него итоги эпизодов)
+        vec_env = self.create_vec_env(env, data=train_df)
+        eval_env = self.create_vec_env(env, n_envs=1, data=eval_df, monitor=True)
+        
+        try:
+            device = self._get_device()
+            self.logger.info(f"Устройство для обучения: {device}")
+            torch.set_float32_matmul_precision('high')
+            
+            # Создаём модель
+            model = SAC(
+                "MlpPolicy",
+                vec_env,
+                verbose=1,
+                learning_rate=self.config.LEARNING_RATE,
+                batch_size=self.config.BATCH_SIZE,
+                buffer_size=1000000,
+                learning_starts=1000,
+                tau=0.005,
+                gamma=0.99,
+                train_freq=1,
+                gradient_steps=-1,  # по обновлению на каждый собранный переход (шаг векторной среды даёт num_envs переходов)
+                ent_coef="auto",
+                target_entropy="auto",
+                policy_kwargs={"net_arch": [256, 256]},
+                device=device,
+                tensorboard_log=f"{self.config.LOG_PATH}/tensorboard/"
+            )
+            
+            # Настраиваем колбэки
+            callbacks = self.setup_callbacks(eval_env, n_envs=vec_env.num_envs)
+            
+            # Обучаем модель
+            self.logger.info("Начинаем обучение...")
+            
+            # Компилируем на время обучения get_action_dist_params актора (веса и state_dict
+            # не меняются): через него идут и выбор действий при сборе опыта (forward),
+            # и шаг градиента (action_log_prob)
+            actor = model.policy.actor
+            if torch_compile_available():
+                actor.get_action_dist_params = torch.compile(
+                    actor.get_action_dist_params,
+                    mode="reduce-overhead" if device == "cuda" else "default"
+                )
+            
+            try:
+                model.learn(
+                    total_timesteps=total_timesteps,
+                    callback=callbacks,
+                    progress_bar=True
+                )
+            finally:
+                actor.__dict__.pop('get_action_dist_params', None)
+        finally:
+            vec_env.close()
+            eval_env.close()
         
         self.logger.info("Обучение завершено!")
         return model
@@ -187,14 +246,18 @@ class TradingModelTrainer:
         total_pnls = []
         win_rates = []
         
+        # Локальные ссылки вместо поиска атрибутов на каждом шаге
+        predict = model.predict
+        env_step = env.step
+        
         for episode in range(n_episodes):
             obs, info = env.reset()
             episode_reward = 0
             done = False
             
             while not done:
-                action, _ = model.predict(obs, deterministic=True)
-                obs, reward, done, truncated, info = env.step(action)
+                action, _ = predict(obs, deterministic=True)
+                obs, reward, done, truncated, info = env_step(action)
                 episode_reward += reward
             
             # Получаем статистику эпизода
@@ -207,12 +270,12 @@ class TradingModelTrainer:
         
         # Агрегируем результаты
         results = {
-            'mean_reward': np.mean(total_rewards),
-            'std_reward': np.std(total_rewards),
-            'mean_return': np.mean(total_pnls),
-            'std_return': np.std(total_pnls),
-            'mean_win_rate': np.mean(win_rates),
-            'std_win_rate': np.std(win_rates)
+            'mean_reward': fmean(total_rewards),
+            'std_reward': pstdev(total_rewards),
+            'mean_return': fmean(total_pnls),
+            'std_return': pstdev(total_pnls),
+            'mean_win_rate': fmean(win_rates),
+            'std_win_rate': pstdev(win_rates)
         }
         
         self.logger.info(f"Результаты оценки: {results}")
@@ -239,28 +302,80 @@ class TradingModelTrainer:
         
         onnx_path = f"{self.config.MODEL_SAVE_PATH}{filename}"
         
-        # Создаём dummy input для экспорта
+        # Создаём dummy input для экспорта: в торговле батч всегда 1, поэтому формы
+        # фиксированы и ONNX Runtime может свернуть все вычисления форм
         dummy_input = torch.randn(1, self.config.WINDOW_SIZE * 5 + 2)
         
-        # Экспортируем в ONNX
-        torch.onnx.export(
-            model.policy.actor,
-            dummy_input,
-            onnx_path,
-            export_params=True,
-            opset_version=11,
-            do_constant_folding=True,
-            input_names=['input'],
-            output_names=['output'],
-            dynamic_axes={
-                'input': {0: 'batch_size'},
-                'output': {0: 'batch_size'}
-            }
-        )
+        # Новый экспортёр (torch.export) доступен начиная с PyTorch 2.5 и требует onnxscript
+        # (torch от него не зависит); он поддерживает opset от 18 и по умолчанию выносит
+        # веса в отдельный .onnx.data файл - сохраняем всё в один файл, чтобы модель
+        # копировалась в бота целиком. Без onnxscript используем старый экспортёр
+        if torch_version() < (2, 5):
+            export_kwargs = {'opset_version': 17}
+        elif importlib.util.find_spec('onnxscript') is None:
+            export_kwargs = {'dynamo': False, 'opset_version': 17}
+        else:
+            export_kwargs = {'dynamo': True, 'external_data': False, 'opset_version': 18}
+        
+        # Экспортируем в ONNX (детерминированный актор в режиме eval - как при инференсе в торговле)
+        actor = model.policy.actor
+        was_training = actor.training
+        actor.eval()
+        try:
+            torch.onnx.export(
+                DeterministicActor(actor).eval(),
+                dummy_input,
+                onnx_path,
+                export_params=True,
+                do_constant_folding=True,
+                input_names=['input'],
+                output_names=['output'],
+                **export_kwargs
+            )
+        finally:
+            actor.train(was_training)
         
         self.logger.info(f"Модель экспортирована в ONNX: {onnx_path}")
+        
+        # Квантизованная int8 версия для быстрого инференса
+        self.quantize_onnx(onnx_path)
+        
         return onnx_path
     
+    def quantize_onnx(self, onnx_path: str) -> str:
+        """Динамическая int8-квантизация весов ONNX модели"""
+        int8_path = onnx_path.replace('.onnx', '_int8.onnx')
+        
+        # Подготовка модели (вывод форм, упрощение графа) - рекомендуемый шаг перед квантизацией
+        prep_path = onnx_path.replace('.onnx', '_prep.onnx')
+        try:
+            quant_pre_process(onnx_path, prep_path)
+            quantize_dynamic(prep_path, int8_path, weight_type=QuantType.QInt8)
+        finally:
+            if os.path.exists(prep_path):
+                os.remove(prep_path)
+        
+        # Проверяем, что квантизованная модель даёт те же действия
+        sample = np.random.randn(1, self.config.WINDOW_SIZE * 5 + 2).astype(np.float32)
+        ref_output = self.create_onnx_session(onnx_path).run(None, {'input': sample})[0]
+        q_output = self.create_onnx_session(int8_path).run(None, {'input': sample})[0]
+        
+        if not np.allclose(ref_output, q_output, atol=1e-2):
+            max_diff = np.abs(ref_output - q_output).max()
+            self.logger.warning(f"Квантизованная модель расходится с исходной: max |Δ| = {max_diff:.4f}")
+        
+        self.logger.info(f"Квантизованная int8 модель: {int8_path}")
+        return int8_path
+    
+    @staticmethod
+    def create_onnx_session(onnx_path: str) -> onnxruntime.InferenceSession:
+        """Сессия ONNX Runtime для инференса со всеми оптимизациями графа"""
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return onnxruntime.InferenceSession(
+            onnx_path, sess_options=options, providers=['CPUExecutionProvider']
+        )
+    
     def plot_training_results(self, model: SAC, env: TradingEnvironment):
         """Визуализация результатов обучения"""
         # Тестируем модель
@@ -271,9 +386,13 @@ class TradingModelTrainer:
         balances = []
         pnls = []
         
+        # Локальные ссылки вместо поиска атрибутов на каждом шаге
+        predict = model.predict
+        env_step = env.step
+        
         while not done:
-            action, _ = model.predict(obs, deterministic=True)
-            obs, reward, done, truncated, info = env.step(action)
+            action, _ = predict(obs, deterministic=True)
+            obs, reward, done, truncated, info = env_step(action)
             
             prices.append(info['current_price'])
             positions.append(info['position'])
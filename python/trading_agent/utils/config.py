@@ -1,8 +1,17 @@
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 
+
+@lru_cache(maxsize=1)
+def _load_env() -> bool:
+    """Загрузка переменных окружения из .env (один раз на процесс)"""
+    load_dotenv()
+    return True
+
+
 # Загружаем переменные окружения
-load_dotenv()
+_load_env()
 
 class Config:
     """Конфигурация для Python части ИИ-трейдинг бота"""
@@ -25,11 +34,11 @@ class Config:
     
     # Данные
     DATA_PATH = './data/'
-    TRADING_PAIRS = os.getenv('TRADING_PAIRS', 'BTCUSDT,ETHUSDT').split(',')
+    TRADING_PAIRS = tuple(pair.strip() for pair in os.getenv('TRADING_PAIRS', 'BTCUSDT,ETHUSDT').split(','))
     
     # RL параметры
     WINDOW_SIZE = 64  # количество свечей для входа
-    FEATURES = ['open', 'high', 'low', 'close', 'volume']
+    FEATURES = ('open', 'high', 'low', 'close', 'volume')
     COMMISSION_RATE = 0.0004  # 0.04% комиссия Binance
     SLIPPAGE_RATE = 0.0001   # 0.01% проскальзывание
     
@@ -40,7 +49,14 @@ class Config:
     BATCH_SIZE = 256
     LEARNING_RATE = 3e-4
     TOTAL_TIMESTEPS = 1000000
+    N_ENVS = min(os.cpu_count() or 1, 8)  # параллельные среды для сбора опыта
     
     # Логирование
     LOG_PATH = './logs/'
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Общий экземпляр конфигурации процесса"""
+    return Config()
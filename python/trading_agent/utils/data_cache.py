@@ -0,0 +1,41 @@
+"""
+Загрузка свечей OHLCV с кэшем в Parquet
+"""
+
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def load_cached_ohlcv(csv_path: str) -> pd.DataFrame:
+    """
+    Загрузка свечей с кэшем в Parquet
+
+    CSV разбирается только при первом запуске и сохраняется в соседний .parquet,
+    дальше читается Parquet через memory map. Индекс в обоих случаях -
+    DatetimeIndex 'timestamp' с точностью до наносекунд, колонки OHLCV - float32
+    """
+    pq_path = csv_path.replace('.csv', '.parquet')
+
+    if os.path.exists(pq_path):
+        df = pq.read_table(pq_path, memory_map=True).to_pandas()
+    else:
+        # Данные, сохранённые старой версией download_data.py
+        # (парсер pyarrow с явными типами; index_col вместе с dtype он не поддерживает)
+        df = pd.read_csv(
+            csv_path,
+            parse_dates=['timestamp'],
+            engine='pyarrow',
+            dtype={column: 'float32' for column in OHLCV_COLUMNS}
+        ).set_index('timestamp')
+        df.to_parquet(pq_path, compression='zstd')
+
+    # CSV даёт datetime64[s], Parquet - [ms] или [ns]: приводим к одному типу
+    df.index = df.index.astype('datetime64[ns]')
+
+    # Среда хранит признаки и наблюдения в float32 - Parquet от download_data.py
+    # хранит float64, поэтому приводим и его
+    return df.astype({column: 'float32' for column in OHLCV_COLUMNS})
@@ -0,0 +1,19 @@
+"""
+JIT-компиляция через Numba с запасным вариантом без неё
+"""
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # Numba - необязательная зависимость
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Заглушка для numba.njit: возвращает функцию без изменений"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+
+        return decorator
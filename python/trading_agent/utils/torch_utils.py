@@ -0,0 +1,17 @@
+"""
+Проверки возможностей установленного PyTorch
+"""
+
+
+def torch_version() -> tuple:
+    """Версия PyTorch в виде (major, minor)"""
+    import torch  # torch импортируется лениво: модуль подключают и лёгкие скрипты
+    
+    return tuple(int(part) for part in torch.__version__.split('.')[:2])
+
+
+def torch_compile_available() -> bool:
+    """torch.compile стабилен начиная с PyTorch 2.1"""
+    import torch
+    
+    return torch_version() >= (2, 1) and hasattr(torch, 'compile')
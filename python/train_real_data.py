@@ -3,33 +3,30 @@
 Обучение RL модели на реальных данных BTC/USDT
 """
 
-import sys
 import os
-import pandas as pd
 import numpy as np
 from datetime import datetime
 
-# Добавляем путь к модулям
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
-
-from environment.trading_env import TradingEnvironment
-from models.trainer import TradingModelTrainer
+from trading_agent.environment.trading_env import TradingEnvironment
+from trading_agent.utils.data_cache import load_cached_ohlcv
+from trading_agent.models.trainer import TradingModelTrainer
 
 def load_real_data():
     """Загружаем реальные данные"""
     print("📊 Загружаем реальные данные BTC/USDT...")
     
     # Путь к файлу
-    data_file = "data/BTCUSDT_1h_2020-01-01_2024-12-31.csv"
+    data_file = "data/BTCUSDT_1h_2020-01-01_2024-12-31.parquet"
+    csv_file = data_file.replace('.parquet', '.csv')
     
-    if not os.path.exists(data_file):
+    # Загружаем данные
+    if os.path.exists(data_file) or os.path.exists(csv_file):
+        df = load_cached_ohlcv(csv_file)
+    else:
         print(f"❌ Файл {data_file} не найден!")
         print("Сначала запустите download_data.py")
         return None
     
-    # Загружаем данные
-    df = pd.read_csv(data_file, index_col='timestamp', parse_dates=True)
-    
     print(f"✅ Загружено {len(df)} свечей")
     print(f"📅 Период: {df.index.min()} - {df.index.max()}")
     print(f"📈 Диапазон цен: {df['close'].min():.2f} - {df['close'].max():.2f}")
@@ -61,6 +58,8 @@ def test_environment(env, n_episodes=3):
     """Тестируем среду на случайных действиях"""
     print(f"\n🧪 Тестируем среду на {n_episodes} эпизодах...")
     
+    env_step = env.step  # локальная ссылка вместо поиска атрибута на каждом шаге
+    
     for episode in range(n_episodes):
         print(f"\n--- Эпизод {episode + 1} ---")
         
@@ -71,20 +70,27 @@ def test_environment(env, n_episodes=3):
         # Ограничиваем количество шагов для быстрого теста
         max_steps = min(100, env.max_steps)
         
+        # Случайные действия генерируются заранее на весь эпизод
+        actions = np.random.default_rng().integers(0, env.action_space.n, size=max(max_steps, 0))
+        
+        # Вывод по шагам копится и печатается одним вызовом после цикла
+        log_lines = []
         while step < max_steps:
-            # Случайное действие
-            action = env.action_space.sample()
+            action = int(actions[step])
             
-            obs, reward, done, truncated, info = env.step(action)
+            obs, reward, done, truncated, info = env_step(action)
             total_reward += reward
             step += 1
             
             if step % 25 == 0:
-                print(f"   Шаг {step}: Действие={action}, Награда={reward:.6f}, Баланс={info['balance']:.2f}")
+                log_lines.append(f"   Шаг {step}: Действие={action}, Награда={reward:.6f}, Баланс={info['balance']:.2f}")
             
             if done:
                 break
         
+        if log_lines:
+            print("\n".join(log_lines))
+        
         # Статистика эпизода
         stats = env.get_statistics()
         print(f"   Эпизод завершён за {step} шагов")
@@ -117,7 +123,7 @@ def main():
         print("🎯 Среда готова к обучению!")
         print("\n📋 Следующие шаги:")
         print("1. Установить Stable-Baselines3: pip install stable-baselines3")
-        print("2. Запустить обучение: python src/models/trainer.py")
+        print("2. Запустить обучение: python -m trading_agent.models.trainer")
         print("3. Или создать простую модель самостоятельно")
         
         # 4. Создаём простую модель (без Stable-Baselines3)
@@ -134,17 +140,11 @@ def create_simple_model(env):
     print("🧠 Создаём простую модель на основе правил...")
     
     # Простая стратегия: покупаем при падении, продаём при росте
-    def simple_strategy(observation):
-        """Простая торговая стратегия"""
-        # Получаем последние цены из наблюдения
-        # observation содержит: [OHLCV за 64 часа + позиция + баланс]
-        
-        # Простая логика: если последние цены падают -> покупаем
-        # Если растут -> продаём
-        
-        # Для простоты используем случайные действия
-        import random
-        return random.choice([0, 1, 2])  # HOLD, BUY, SELL
+    # Для простоты используем случайные действия HOLD, BUY, SELL -
+    # все 200 действий генерируются заранее одним вызовом
+    n_steps = 200  # 200 шагов
+    rng = np.random.default_rng(0)
+    actions = rng.integers(0, 3, size=n_steps, dtype=np.int64)
     
     # Тестируем простую стратегию
     print("🧪 Тестируем простую стратегию...")
@@ -152,19 +152,25 @@ def create_simple_model(env):
     obs, info = env.reset()
     total_reward = 0
     step = 0
+    env_step = env.step  # локальная ссылка вместо поиска атрибута на каждом шаге
     
-    while step < 200:  # 200 шагов
-        action = simple_strategy(obs)
-        obs, reward, done, truncated, info = env.step(action)
+    # Вывод по шагам копится и печатается одним вызовом после цикла
+    log_lines = []
+    while step < n_steps:
+        action = int(actions[step])
+        obs, reward, done, truncated, info = env_step(action)
         total_reward += reward
         step += 1
         
         if step % 50 == 0:
-            print(f"   Шаг {step}: Действие={action}, Баланс={info['balance']:.2f}")
+            log_lines.append(f"   Шаг {step}: Действие={action}, Баланс={info['balance']:.2f}")
         
         if done:
             break
     
+    if log_lines:
+        print("\n".join(log_lines))
+    
     # Финальная статистика
     stats = env.get_statistics()
     print(f"\n📊 Результаты простой стратегии:")
@@ -3,47 +3,61 @@
 Обучение SAC модели на реальных данных BTC/USDT
 """
 
-import sys
 import os
-import pandas as pd
-import numpy as np
 from datetime import datetime
 import time
+from dataclasses import dataclass, asdict
+from statistics import fmean, pstdev
 
-# Добавляем путь к модулям
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+from trading_agent.environment.trading_env import TradingEnvironment
+from trading_agent.utils.data_cache import load_cached_ohlcv
+from trading_agent.utils.torch_utils import torch_compile_available
 
-from environment.trading_env import TradingEnvironment
-from stable_baselines3 import PPO
-from stable_baselines3.common.callbacks import EvalCallback, CheckpointCallback
-from stable_baselines3.common.vec_env import DummyVecEnv
-from stable_baselines3.common.monitor import Monitor
+# Stable-Baselines3 и torch импортируются внутри функций: они тянут за собой
+# тяжёлые зависимости, которые не нужны, пока дело не дошло до обучения
+
+@dataclass(frozen=True)
+class PPOConfig:
+    """Гиперпараметры PPO"""
+    learning_rate: float = 3e-4
+    batch_size: int = 256
+    n_steps: int = 2048
+    gamma: float = 0.99
+    gae_lambda: float = 0.95
+    clip_range: float = 0.2
+    ent_coef: float = 0.01
 
 def load_real_data():
     """Загружаем реальные данные"""
     print("📊 Загружаем реальные данные BTC/USDT...")
     
-    data_file = "data/BTCUSDT_1h_2020-01-01_2024-12-31.csv"
+    data_file = "data/BTCUSDT_1h_2020-01-01_2024-12-31.parquet"
+    csv_file = data_file.replace('.parquet', '.csv')
     
-    if not os.path.exists(data_file):
+    if os.path.exists(data_file) or os.path.exists(csv_file):
+        df = load_cached_ohlcv(csv_file)
+    else:
         print(f"❌ Файл {data_file} не найден!")
         print("Сначала запустите download_data.py")
         return None
-    
-    df = pd.read_csv(data_file, index_col='timestamp', parse_dates=True)
     print(f"✅ Загружено {len(df)} свечей")
     
     return df
 
-def create_vec_env(env):
-    """Создаём векторную среду для Stable-Baselines3"""
-    def make_env():
-        return Monitor(env)
+def create_vec_env(env, n_envs=None, monitor=False):
+    """Создаём векторную среду для Stable-Baselines3 (см. trading_agent.environment.vec_env)"""
+    from trading_agent.environment.vec_env import create_vec_env as create_trading_vec_env
     
-    return DummyVecEnv([make_env])
+    return create_trading_vec_env(env, n_envs=n_envs, monitor=monitor)
 
-def setup_callbacks(eval_env):
-    """Настраиваем колбэки для обучения"""
+def setup_callbacks(eval_env, n_envs=1):
+    """
+    Настраиваем колбэки для обучения
+    
+    Колбэки вызываются раз на шаг векторной среды, поэтому частоты делятся на n_envs
+    """
+    from stable_baselines3.common.callbacks import EvalCallback, CheckpointCallback
+    
     callbacks = []
     
     # Колбэк для оценки
@@ -51,7 +65,7 @@ def setup_callbacks(eval_env):
         eval_env,
         best_model_save_path="./models/best_model/",
         log_path="./logs/eval/",
-        eval_freq=5000,  # Оцениваем каждые 5000 шагов
+        eval_freq=max(5000 // n_envs, 1),  # Оцениваем каждые 5000 шагов
         deterministic=True,
         render=False
     )
@@ -59,7 +73,7 @@ def setup_callbacks(eval_env):
     
     # Колбэк для сохранения чекпоинтов
     checkpoint_callback = CheckpointCallback(
-        save_freq=10000,  # Сохраняем каждые 10000 шагов
+        save_freq=max(10000 // n_envs, 1),  # Сохраняем каждые 10000 шагов
         save_path="./models/checkpoints/",
         name_prefix="trading_model"
     )
@@ -67,96 +81,135 @@ def setup_callbacks(eval_env):
     
     return callbacks
 
-def train_ppo_model(env, total_timesteps=100000):
+def train_ppo_model(env, total_timesteps=100000, ppo_config=PPOConfig()):
     """Обучаем PPO модель"""
+    import torch
+    from stable_baselines3 import PPO
+    
     print(f"\n🧠 Начинаем обучение PPO модели на {total_timesteps} шагах...")
     
-    # Создаём векторную среду
+    # Создаём векторные среды: параллельную для обучения и отдельную для оценки,
+    # чтобы оценка не сбрасывала эпизоды обучающих сред
+    # (Monitor нужен только оценочной среде - EvalCallback читает из него итоги эпизодов)
     vec_env = create_vec_env(env)
+    eval_env = create_vec_env(env, n_envs=1, monitor=True)
     
     # Создаём модель
     model = PPO(
         "MlpPolicy",
         vec_env,
         verbose=1,
-        learning_rate=3e-4,
-        batch_size=256,
-        n_steps=2048,
-        gamma=0.99,
-        gae_lambda=0.95,
-        clip_range=0.2,
-        ent_coef=0.01
+        **asdict(ppo_config)
     )
     
     # Настраиваем колбэки
-    callbacks = setup_callbacks(vec_env)
+    callbacks = setup_callbacks(eval_env, n_envs=vec_env.num_envs)
     
     # Создаём папки для сохранения
-    os.makedirs("./models/best_model/", exist_ok=True)
-    os.makedirs("./models/checkpoints/", exist_ok=True)
-    os.makedirs("./logs/eval/", exist_ok=True)
-
+    for path in ("./models/best_model/", "./models/checkpoints/", "./logs/eval/"):
+        os.makedirs(path, exist_ok=True)
     
     # Обучаем модель
     print("🚀 Начинаем обучение...")
-    start_time = time.time()
+    start_time = time.monotonic()
     
-    model.learn(
-        total_timesteps=total_timesteps,
-        callback=callbacks
-    )
+    # Компилируем политику на время обучения: формы входов фиксированы
+    # (n_envs при сборе опыта, batch_size при обновлении), веса и state_dict не меняются
+    policy = model.policy
+    compiled_methods = ('forward', 'evaluate_actions') if torch_compile_available() else ()
+    for name in compiled_methods:
+        setattr(policy, name, torch.compile(
+            getattr(policy, name),
+            mode="reduce-overhead" if model.device.type == "cuda" else "default"
+        ))
     
-    training_time = time.time() - start_time
+    try:
+        model.learn(
+            total_timesteps=total_timesteps,
+            callback=callbacks
+        )
+    finally:
+        for name in compiled_methods:
+            policy.__dict__.pop(name, None)
+        vec_env.close()
+        eval_env.close()
+    
+    training_time = time.monotonic() - start_time
     print(f"✅ Обучение завершено за {training_time:.2f} секунд!")
     
     return model
 
 def evaluate_model(model, env, n_episodes=5):
     """Оцениваем обученную модель"""
+    import torch
+    
     print(f"\n🧪 Оцениваем модель на {n_episodes} эпизодах...")
     
     total_rewards = []
     total_pnls = []
     win_rates = []
     
-    for episode in range(n_episodes):
-        print(f"\n--- Эпизод {episode + 1} ---")
-        
-        obs, info = env.reset()
-        episode_reward = 0
-        done = False
-        step = 0
-        
-        while not done and step < 500:  # Ограничиваем количество шагов
-            action, _ = model.predict(obs, deterministic=True)
-            obs, reward, done, truncated, info = env.step(action)
-            episode_reward += reward
-            step += 1
+    # Политика вызывается напрямую с заранее выделенным тензором наблюдения:
+    # model.predict на каждом шаге заново проверяет и конвертирует массив
+    policy = model.policy
+    was_training = policy.training
+    policy.set_training_mode(False)
+    obs_tensor = torch.empty((1, *env.observation_space.shape), dtype=torch.float32, device=model.device)
+    
+    # Локальные ссылки вместо поиска атрибутов на каждом шаге
+    get_distribution = policy.get_distribution
+    env_step = env.step
+    
+    try:
+        for episode in range(n_episodes):
+            print(f"\n--- Эпизод {episode + 1} ---")
             
-            if step % 100 == 0:
-                print(f"   Шаг {step}: Действие={action}, Баланс={info['balance']:.2f}")
-        
-        # Получаем статистику эпизода
-        stats = env.get_statistics()
-        total_rewards.append(episode_reward)
-        total_pnls.append(stats.get('total_return', 0))
-        win_rates.append(stats.get('win_rate', 0))
-        
-        print(f"   Эпизод завершён за {step} шагов")
-        print(f"   Общая награда: {episode_reward:.6f}")
-        print(f"   Финальный баланс: {info['balance']:.2f}")
-        print(f"   Количество сделок: {info['trades_count']}")
-        print(f"   Win Rate: {stats.get('win_rate', 0):.2f}")
-        print(f"   Доходность: {stats.get('total_return', 0):.4f}")
+            obs, info = env.reset()
+            episode_reward = 0
+            done = False
+            step = 0
+            
+            # Вывод по шагам копится и печатается одним вызовом после цикла
+            log_lines = []
+            while not done and step < 500:  # Ограничиваем количество шагов
+                with torch.no_grad():
+                    obs_tensor.copy_(torch.from_numpy(obs))
+                    action = int(get_distribution(obs_tensor).get_actions(deterministic=True))
+                obs, reward, done, truncated, info = env_step(action)
+                episode_reward += reward
+                step += 1
+                
+                if step % 100 == 0:
+                    log_lines.append(f"   Шаг {step}: Действие={action}, Баланс={info['balance']:.2f}")
+            
+            if log_lines:
+                print("\n".join(log_lines))
+            
+            # Получаем статистику эпизода
+            stats = env.get_statistics() or {}
+            win_rate = stats.get('win_rate', 0)
+            total_return = stats.get('total_return', 0)
+            total_rewards.append(episode_reward)
+            total_pnls.append(total_return)
+            win_rates.append(win_rate)
+            
+            print(f"   Эпизод завершён за {step} шагов")
+            print(f"   Общая награда: {episode_reward:.6f}")
+            print(f"   Финальный баланс: {info['balance']:.2f}")
+            print(f"   Количество сделок: {info['trades_count']}")
+            print(f"   Win Rate: {win_rate:.2f}")
+            print(f"   Доходность: {total_return:.4f}")
+    finally:
+        policy.set_training_mode(was_training)
     
     # Агрегируем результаты
     results = {
-        'mean_reward': np.mean(total_rewards),
-        'std_reward': np.std(total_rewards),
-        'mean_return': np.mean(total_pnls),
-        'std_return': np.std(total_pnls),
-        'mean_win_rate': np.mean(win_rates),
-        'std_win_rate': np.std(win_rates)
+        'mean_reward': fmean(total_rewards),
+        'std_reward': pstdev(total_rewards),
+        'mean_return': fmean(total_pnls),
+        'std_return': pstdev(total_pnls),
+        'mean_win_rate': fmean(win_rates),
+        'std_win_rate': pstdev(win_rates)
     }
     
     print(f"\n📊 Результаты оценки:")